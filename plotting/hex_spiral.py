@@ -3,6 +3,8 @@ Core penny spiral building logic for hexagonal grids.
 Reusable module - no visualization dependencies.
 """
 
+from functools import lru_cache
+
 # Hex direction vectors (flat-top hexagons)
 # Directions: 0=right, 1=up-right, 2=up-left, 3=left, 4=down-left, 5=down-right
 HEX_DIRS = [
@@ -14,37 +16,52 @@ HEX_DIRS = [
     (0.75, -1.3),       # 5: down-right
 ]
 
+# Same directions in integer axial coords (q, r), where
+# (x, y) = q * HEX_DIRS[0] + r * HEX_DIRS[1]
+HEX_DIRS_INT = [
+    (1, 0),             # 0: right
+    (0, 1),             # 1: up-right
+    (-1, 1),            # 2: up-left
+    (-1, 0),            # 3: left
+    (0, -1),            # 4: down-left
+    (1, -1),            # 5: down-right
+]
+
 
 def add_vec(a, b):
     return (a[0] + b[0], a[1] + b[1])
 
 
-def vec_close(a, b, tol=0.1):
-    return abs(a[0] - b[0]) < tol and abs(a[1] - b[1]) < tol
+def axial_to_xy(pos):
+    """Convert axial (q, r) to (x, y) coordinates."""
+    q, r = pos
+    return (1.5 * q + 0.75 * r, 1.3 * r)
+
+
+def axial_dist2(pos):
+    """Squared distance to origin, scaled by 10^4 so it stays an exact int."""
+    q, r = pos
+    return 5625 * (2 * q + r)**2 + 16900 * r * r
 
 
-def find_neighbors(pos, positions):
-    """Find which existing nodes are adjacent to position pos."""
+def find_neighbors(pos, occupied):
+    """Find which existing nodes are adjacent to axial position pos."""
     neighbors = []
-    for node, node_pos in positions.items():
-        for d in HEX_DIRS:
-            if vec_close(add_vec(node_pos, d), pos):
-                neighbors.append(node)
-                break
+    for d in HEX_DIRS_INT:
+        node = occupied.get(add_vec(pos, d))
+        if node is not None:
+            neighbors.append(node)
     return neighbors
 
 
 def get_neighbor_positions(pos):
-    """Get all 6 neighboring positions of pos."""
-    return [add_vec(pos, d) for d in HEX_DIRS]
+    """Get all 6 neighboring axial positions of pos."""
+    return [add_vec(pos, d) for d in HEX_DIRS_INT]
 
 
-def position_occupied(pos, positions, tol=0.1):
-    """Check if a position is already occupied."""
-    for existing in positions.values():
-        if vec_close(pos, existing, tol):
-            return True
-    return False
+def position_occupied(pos, occupied):
+    """Check if an axial position is already occupied."""
+    return pos in occupied
 
 
 def build_spiral(n):
@@ -56,32 +73,40 @@ def build_spiral(n):
 
     Key constraint: each new node must be adjacent to the previous node (spiral property).
     Among valid positions, prefer more total contacts, then closest to origin.
+
+    Results are memoized per n; callers get fresh copies they may mutate.
     """
+    positions, adjacencies = _build_spiral_cached(n)
+    return dict(positions), set(adjacencies)
+
+
+@lru_cache(maxsize=None)
+def _build_spiral_cached(n):
+    """Build the spiral once per n, returned as immutable (tuple, frozenset)."""
     if n < 1:
-        return {}, set()
+        return (), frozenset()
 
-    positions = {0: (0, 0)}
+    # Work in exact axial coords; occupied maps (q, r) -> node
+    axial = [(0, 0)]
+    occupied = {(0, 0): 0}
     adjacencies = set()
 
-    if n == 1:
-        return positions, adjacencies
-
     for node in range(1, n):
         best_pos = None
         best_contacts = 0
         best_dist = float('inf')
 
         # Must be adjacent to previous node (node-1)
-        prev_pos = positions[node - 1]
+        prev_pos = axial[node - 1]
         candidates = get_neighbor_positions(prev_pos)
 
         for cand in candidates:
-            if position_occupied(cand, positions):
+            if position_occupied(cand, occupied):
                 continue
 
-            neighbors = find_neighbors(cand, positions)
+            neighbors = find_neighbors(cand, occupied)
             num_contacts = len(neighbors)
-            dist = cand[0]**2 + cand[1]**2
+            dist = axial_dist2(cand)
 
             # Prefer more contacts, then closer to origin
             if (num_contacts > best_contacts or
@@ -93,12 +118,13 @@ def build_spiral(n):
         if best_pos is None:
             raise ValueError(f"Could not place node {node}")
 
-        positions[node] = best_pos
-        neighbors = find_neighbors(best_pos, positions)
-        for neighbor in neighbors:
+        for neighbor in find_neighbors(best_pos, occupied):
             adjacencies.add((min(node, neighbor), max(node, neighbor)))
+        axial.append(best_pos)
+        occupied[best_pos] = node
 
-    return positions, adjacencies
+    positions = tuple((node, axial_to_xy(pos)) for node, pos in enumerate(axial))
+    return positions, frozenset(adjacencies)
 
 
 def get_adjacencies(n):
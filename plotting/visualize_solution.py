@@ -5,22 +5,31 @@ Shows which items are adjacent in each arrangement.
 
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
+from matplotlib.collections import LineCollection, PatchCollection
 import numpy as np
+import textwrap
 from itertools import combinations
 
 from hex_spiral import build_spiral
 
 
-def draw_arrangement(ax, arrangement, positions, adjacencies, title, new_pairs=None):
+def spiral_limits(positions, margin=1.5):
+    """Axis limits ((xmin, xmax), (ymin, ymax)) that fit all positions."""
+    xs = [p[0] for p in positions.values()]
+    ys = [p[1] for p in positions.values()]
+    return (min(xs) - margin, max(xs) + margin), (min(ys) - margin, max(ys) + margin)
+
+
+def draw_arrangement(ax, arrangement, positions, adjacencies, title, new_pairs=None,
+                     limits=None):
     """Draw one arrangement on the given axes. Highlights new_pairs in green."""
     ax.set_aspect('equal')
 
-    # Compute bounds from positions
-    xs = [p[0] for p in positions.values()]
-    ys = [p[1] for p in positions.values()]
-    margin = 1.5
-    ax.set_xlim(min(xs) - margin, max(xs) + margin)
-    ax.set_ylim(min(ys) - margin, max(ys) + margin)
+    # Bounds are shared by all arrangements, so callers may pass them in
+    if limits is None:
+        limits = spiral_limits(positions)
+    ax.set_xlim(*limits[0])
+    ax.set_ylim(*limits[1])
     ax.set_title(title, fontsize=14, fontweight='bold')
     ax.axis('off')
 
@@ -32,85 +41,98 @@ def draw_arrangement(ax, arrangement, positions, adjacencies, title, new_pairs=N
     if new_pairs is None:
         new_pairs = set()
 
-    # Draw edges (adjacencies)
+    # Draw edges (adjacencies), new pairs highlighted, one collection each
+    segs_new = []
+    segs_old = []
     for slot_a, slot_b in adjacencies:
-        xa, ya = positions[slot_a]
-        xb, yb = positions[slot_b]
-        # Check if this edge is a new pair
         item_a = slot_to_item[slot_a]
         item_b = slot_to_item[slot_b]
         pair = (min(item_a, item_b), max(item_a, item_b))
-        if pair in new_pairs:
-            ax.plot([xa, xb], [ya, yb], color='#22aa22', linewidth=4, alpha=0.9, zorder=1)
-        else:
-            ax.plot([xa, xb], [ya, yb], color='#aaaaaa', linewidth=2, alpha=0.5, zorder=0)
+        seg = [positions[slot_a], positions[slot_b]]
+        (segs_new if pair in new_pairs else segs_old).append(seg)
+    ax.add_collection(LineCollection(segs_old, colors='#aaaaaa', linewidths=2, alpha=0.5, zorder=0))
+    ax.add_collection(LineCollection(segs_new, colors='#22aa22', linewidths=4, alpha=0.9, zorder=1))
+
+    # Draw hexagons (flat-top orientation) as one collection
+    hex_patches = [
+        patches.RegularPolygon((x, y), numVertices=6, radius=0.7, orientation=0)
+        for x, y in positions.values()
+    ]
+    ax.add_collection(PatchCollection(
+        hex_patches, facecolor='lightyellow', edgecolor='black', linewidth=2
+    ))
 
-    # Draw hexagons and labels
+    # Label with item numbers
     for slot, (x, y) in positions.items():
-        # Draw hexagon (flat-top orientation)
-        hex_patch = patches.RegularPolygon(
-            (x, y), numVertices=6, radius=0.7,
-            orientation=0,
-            facecolor='lightyellow', edgecolor='black', linewidth=2
-        )
-        ax.add_patch(hex_patch)
-
-        # Label with item number
         item = slot_to_item[slot]
         ax.text(x, y, str(item), ha='center', va='center',
                 fontsize=16, fontweight='bold')
 
 
 def get_covered_pairs(arrangement, adjacencies):
-    """Get which item pairs are adjacent in this arrangement."""
-    slot_to_item = {}
-    for slot, item in enumerate(arrangement):
-        slot_to_item[slot] = item
+    """Get which item pairs are adjacent in this arrangement.
 
-    pairs = set()
-    for slot_a, slot_b in adjacencies:
-        item_a = slot_to_item[slot_a]
-        item_b = slot_to_item[slot_b]
-        pairs.add((min(item_a, item_b), max(item_a, item_b)))
-    return pairs
+    adjacencies may be a set of slot pairs or a precomputed (m, 2) int array.
+    """
+    if not isinstance(adjacencies, np.ndarray):
+        adjacencies = np.array(sorted(adjacencies), dtype=np.int32).reshape(-1, 2)
+
+    # Map slot pairs to item pairs, then order each pair (min, max)
+    mapped = np.asarray(arrangement)[adjacencies]
+    mapped.sort(axis=1)
+    return set(map(tuple, mapped.tolist()))
 
 
 def visualize_solution(arrangements, n=9, output_file="solution.png"):
     """Create visualization of the solution."""
     positions, adjacencies = build_spiral(n)
+    adj_arr = np.array(sorted(adjacencies), dtype=np.int32).reshape(-1, 2)
+
+    # Size the figure to the spiral so no tight-bbox re-render is needed
+    limits = spiral_limits(positions)
+    panel_w = 6
+    panel_h = panel_w * (limits[1][1] - limits[1][0]) / (limits[0][1] - limits[0][0])
+    fig_w = panel_w * len(arrangements)
+    title_h = 0.8
+
+    all_pairs = set(combinations(range(n), 2))
+    covered = [get_covered_pairs(arr, adj_arr) for arr in arrangements]
+    covered_so_far = set().union(*covered)
+    missing = all_pairs - covered_so_far
+
+    summary = f"{n}-Node Solution: {len(covered_so_far)}/{len(all_pairs)} pairs covered"
+    if missing:
+        summary += "\n" + textwrap.fill(f"Missing: {missing}", width=int(fig_w * 7))
+    else:
+        summary += " ✓"
+    footer_h = 0.4 + 0.3 * summary.count("\n")
+    fig_h = panel_h + title_h + footer_h
 
-    fig, axes = plt.subplots(1, len(arrangements), figsize=(6*len(arrangements), 8))
+    fig, axes = plt.subplots(1, len(arrangements), figsize=(fig_w, fig_h))
     if len(arrangements) == 1:
         axes = [axes]
+    fig.subplots_adjust(left=0, right=1, bottom=footer_h / fig_h,
+                        top=1 - title_h / fig_h, wspace=0)
 
-    all_pairs = set(combinations(range(n), 2))
     covered_so_far = set()
-
     for i, (ax, arr) in enumerate(zip(axes, arrangements)):
-        covered = get_covered_pairs(arr, adjacencies)
-        new_covered = covered - covered_so_far
-        covered_so_far |= covered
+        new_covered = covered[i] - covered_so_far
+        covered_so_far |= covered[i]
 
-        title = f"Arrangement {i+1}\n({len(covered)} edges, {len(new_covered)} new)"
-        draw_arrangement(ax, arr, positions, adjacencies, title, new_pairs=new_covered)
+        title = f"Arrangement {i+1}\n({len(covered[i])} edges, {len(new_covered)} new)"
+        draw_arrangement(ax, arr, positions, adjacencies, title, new_pairs=new_covered,
+                         limits=limits)
 
     # Summary
-    missing = all_pairs - covered_so_far
-    fig.suptitle(
-        f"{n}-Node Solution: {len(covered_so_far)}/{len(all_pairs)} pairs covered" +
-        (f"\nMissing: {missing}" if missing else " ✓"),
-        fontsize=16, y=0.02
-    )
-
-    plt.tight_layout()
-    plt.savefig(output_file, dpi=150, bbox_inches='tight', facecolor='white')
+    fig.suptitle(summary, fontsize=16, y=(footer_h - 0.1) / fig_h)
+
+    plt.savefig(output_file, dpi=150, facecolor='white')
     print(f"Saved to {output_file}")
 
     # Also print pair coverage matrix
     print("\nPair coverage:")
-    for i, arr in enumerate(arrangements, 1):
-        covered = get_covered_pairs(arr, adjacencies)
-        print(f"  Arr{i}: {sorted(covered)}")
+    for i, pairs in enumerate(covered, 1):
+        print(f"  Arr{i}: {sorted(pairs)}")
 
     print(f"\nTotal unique pairs: {len(covered_so_far)}/{len(all_pairs)}")
     if missing:
@@ -5,37 +5,63 @@ Accounts for rotation and reflection symmetry (D6 group = 12 operations).
 """
 
 import sys
-from typing import Set, FrozenSet, List, Tuple
+from typing import Set, List, Tuple
 
-# Represent triangles by their 3 vertices in a triangular lattice
-# Vertices use (a, b) integer coordinates where:
+# Triangles live on a triangular lattice whose vertices use (a, b) integer
+# coordinates where:
 #   real position = (a + b/2, b * sqrt(3)/2)
+# The up triangle at grid position (q, r) has vertices (q,r), (q+1,r), (q,r+1);
+# the down triangle has vertices (q,r+1), (q+1,r), (q+1,r+1).
+#
+# A triangle is packed into a single int key:
+#   key = ((q + OFFSET) << 13) | ((r + OFFSET) << 1) | orient   (0=up, 1=down)
+# so sorting keys sorts by (q, r, orient). A polyiamond is the sorted tuple of
+# its triangle keys, which makes canonical forms cheap to compare and hash.
 Vertex = Tuple[int, int]
-Triangle = FrozenSet[Vertex]  # Always exactly 3 vertices
-Polyiamond = FrozenSet[Triangle]
+Triangle = int
+Polyiamond = Tuple[Triangle, ...]
+
+OFFSET = 1 << 11
+Q_SHIFT = 13
+R_SHIFT = 1
+FIELD_MASK = (1 << 12) - 1
+
+
+def pack_triangle(q: int, r: int, orient: int) -> Triangle:
+    """Pack grid position and orientation into a triangle key."""
+    return ((q + OFFSET) << Q_SHIFT) | ((r + OFFSET) << R_SHIFT) | orient
+
+
+def unpack_triangle(tri: Triangle) -> Tuple[int, int, int]:
+    """Unpack a triangle key into (q, r, orientation)."""
+    return ((tri >> Q_SHIFT) - OFFSET, ((tri >> R_SHIFT) & FIELD_MASK) - OFFSET, tri & 1)
+
+
+def triangle_vertices(tri: Triangle) -> Tuple[Vertex, Vertex, Vertex]:
+    """Return the 3 lattice vertices of a triangle, in sorted order."""
+    q, r, orient = unpack_triangle(tri)
+    if orient == 0:
+        return (q, r), (q, r + 1), (q + 1, r)
+    return (q, r + 1), (q + 1, r), (q + 1, r + 1)
 
 
 def make_triangle(v1: Vertex, v2: Vertex, v3: Vertex) -> Triangle:
     """Create a triangle from 3 vertices."""
-    return frozenset([v1, v2, v3])
+    # The vertex sum is (3q+1, 3r+1) for up and (3q+2, 3r+2) for down triangles
+    sa = v1[0] + v2[0] + v3[0]
+    sb = v1[1] + v2[1] + v3[1]
+    orient = sa % 3 - 1
+    return pack_triangle((sa - 1 - orient) // 3, (sb - 1 - orient) // 3, orient)
 
 
 def get_grid_triangles_at(q: int, r: int) -> Tuple[Triangle, Triangle]:
     """Get the up and down triangles at grid position (q, r)."""
-    # Up-pointing triangle: vertices at (q,r), (q+1,r), (q,r+1)
-    up = make_triangle((q, r), (q + 1, r), (q, r + 1))
-    # Down-pointing triangle: vertices at (q,r+1), (q+1,r), (q+1,r+1)
-    down = make_triangle((q, r + 1), (q + 1, r), (q + 1, r + 1))
-    return up, down
+    return pack_triangle(q, r, 0), pack_triangle(q, r, 1)
 
 
 def is_up_pointing(tri: Triangle) -> bool:
-    """Check if triangle is up-pointing based on vertex arrangement."""
-    verts = sorted(tri)
-    # Up: two vertices have same b, third has b+1
-    # Down: two vertices have same b, third has b-1
-    b_values = sorted(v[1] for v in verts)
-    return b_values[0] == b_values[1]  # Two lower, one higher = up
+    """Check if triangle is up-pointing."""
+    return tri & 1 == 0
 
 
 def rotate_vertex_60(v: Vertex) -> Vertex:
@@ -50,87 +76,110 @@ def reflect_vertex(v: Vertex) -> Vertex:
     return (a + b, -b)
 
 
-def transform_triangle(tri: Triangle, rotate: int, do_reflect: bool) -> Triangle:
-    """Apply rotation and optional reflection to triangle."""
-    verts = list(tri)
+def _d6_matrix(rotate: int, do_reflect: bool) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+    """Compose reflection then rotation into one integer 2x2 matrix."""
+    cols = []
+    for v in [(1, 0), (0, 1)]:
+        if do_reflect:
+            v = reflect_vertex(v)
+        for _ in range(rotate):
+            v = rotate_vertex_60(v)
+        cols.append(v)
+    return ((cols[0][0], cols[1][0]), (cols[0][1], cols[1][1]))
+
+
+# The 12 D6 operations, indexed by rotate + 6 * do_reflect
+D6 = [_d6_matrix(rot, do_reflect) for do_reflect in [False, True] for rot in range(6)]
 
-    # Apply reflection first
-    if do_reflect:
-        verts = [reflect_vertex(v) for v in verts]
 
-    # Apply rotation
-    for _ in range(rotate % 6):
-        verts = [rotate_vertex_60(v) for v in verts]
+def _apply_matrix(tri: Triangle, m) -> Triangle:
+    """Apply a D6 matrix to a triangle key."""
+    q, r, orient = unpack_triangle(tri)
+    # Both symmetries are linear, so transform the vertex sum directly
+    x = 3 * q + 1 + orient
+    y = 3 * r + 1 + orient
+    sa = m[0][0] * x + m[0][1] * y
+    sb = m[1][0] * x + m[1][1] * y
+    orient = sa % 3 - 1
+    return pack_triangle((sa - 1 - orient) // 3, (sb - 1 - orient) // 3, orient)
 
-    return frozenset(verts)
+
+def transform_triangle(tri: Triangle, rotate: int, do_reflect: bool) -> Triangle:
+    """Apply rotation and optional reflection to triangle."""
+    return _apply_matrix(tri, D6[rotate % 6 + 6 * do_reflect])
 
 
-def transform_shape(shape: Polyiamond, rotate: int, do_reflect: bool) -> Polyiamond:
+def transform_shape(shape: Polyiamond, rotate: int, do_reflect: bool) -> List[Triangle]:
     """Apply rotation and optional reflection to entire shape."""
-    return frozenset(transform_triangle(tri, rotate, do_reflect) for tri in shape)
+    m = D6[rotate % 6 + 6 * do_reflect]
+    return [_apply_matrix(tri, m) for tri in shape]
 
 
-def normalize_position(shape: Polyiamond) -> Polyiamond:
-    """Translate shape so minimum vertex coordinates are at (0, 0)."""
-    if not shape:
-        return shape
+def _normalization_shift(shape) -> int:
+    """Key offset that translates shape so minimum q and r are 0."""
+    min_q = min(tri >> Q_SHIFT for tri in shape)
+    min_r = min((tri >> R_SHIFT) & FIELD_MASK for tri in shape)
+    return ((min_q - OFFSET) << Q_SHIFT) + ((min_r - OFFSET) << R_SHIFT)
 
-    all_verts = [v for tri in shape for v in tri]
-    min_a = min(v[0] for v in all_verts)
-    min_b = min(v[1] for v in all_verts)
 
-    new_triangles = set()
-    for tri in shape:
-        new_verts = frozenset((a - min_a, b - min_b) for a, b in tri)
-        new_triangles.add(new_verts)
+def normalize_position(shape) -> Polyiamond:
+    """Translate shape so minimum q and r are 0; return it sorted."""
+    if not shape:
+        return ()
 
-    return frozenset(new_triangles)
+    shift = _normalization_shift(shape)
+    return tuple(sorted(tri - shift for tri in shape))
 
 
-def canonicalize(shape: Polyiamond) -> Polyiamond:
-    """Return canonical form (lexicographically smallest under all symmetries)."""
-    candidates = []
+def symmetric_forms(shape) -> List[Polyiamond]:
+    """Return the normalized shape under each of the 12 D6 operations."""
+    forms = []
 
     # D6 group: 6 rotations × 2 (with/without reflection) = 12 operations
     for rot in range(6):
         for do_reflect in [False, True]:
             transformed = transform_shape(shape, rot, do_reflect)
-            normalized = normalize_position(transformed)
-            candidates.append(normalized)
+            forms.append(normalize_position(transformed))
 
-    # Convert to sortable form for comparison
-    def shape_key(s):
-        return sorted(tuple(sorted(tri)) for tri in s)
+    return forms
 
-    return min(candidates, key=shape_key)
 
+def canonicalize(shape) -> Polyiamond:
+    """Return canonical form (lexicographically smallest under all symmetries)."""
+    if not shape:
+        return ()
 
-def get_adjacent_triangles(tri: Triangle) -> List[Triangle]:
-    """Get all triangles that share an edge with the given triangle."""
-    verts = list(tri)
-    neighbors = []
-
-    # For each pair of vertices (edge), find the triangle on the other side
-    for i in range(3):
-        v1, v2 = verts[i], verts[(i + 1) % 3]
-        v3 = verts[(i + 2) % 3]  # The vertex not on this edge
+    best = None
+    for m in D6:
+        transformed = [_apply_matrix(tri, m) for tri in shape]
+        shift = _normalization_shift(transformed)
+        # The smallest key is the first element of the normalized form, so a
+        # larger one loses to the incumbent without sorting
+        if best is not None and min(transformed) - shift > best[0]:
+            continue
+        candidate = tuple(sorted(tri - shift for tri in transformed))
+        if best is None or candidate < best:
+            best = candidate
 
-        # The fourth vertex that completes a parallelogram
-        # v4 = v1 + v2 - v3
-        v4 = (v1[0] + v2[0] - v3[0], v1[1] + v2[1] - v3[1])
+    return best
 
-        neighbor = make_triangle(v1, v2, v4)
-        neighbors.append(neighbor)
 
-    return neighbors
+def get_adjacent_triangles(tri: Triangle) -> List[Triangle]:
+    """Get all triangles that share an edge with the given triangle."""
+    # Up (q,r) borders down (q,r), (q-1,r), (q,r-1);
+    # down (q,r) borders up (q,r), (q+1,r), (q,r+1)
+    if tri & 1 == 0:
+        return [tri + 1, tri + 1 - (1 << Q_SHIFT), tri + 1 - (1 << R_SHIFT)]
+    return [tri - 1, tri - 1 + (1 << Q_SHIFT), tri - 1 + (1 << R_SHIFT)]
 
 
-def get_boundary(shape: Polyiamond) -> Set[Triangle]:
+def get_boundary(shape) -> Set[Triangle]:
     """Get all triangles adjacent to the shape but not in it."""
+    members = set(shape)
     boundary = set()
     for tri in shape:
         for neighbor in get_adjacent_triangles(tri):
-            if neighbor not in shape:
+            if neighbor not in members:
                 boundary.add(neighbor)
     return boundary
 
@@ -142,7 +191,7 @@ def enumerate_polyiamonds(n: int) -> Set[Polyiamond]:
 
     # Start with single up-pointing triangle
     up, _ = get_grid_triangles_at(0, 0)
-    initial = frozenset([up])
+    initial = (up,)
 
     if n == 1:
         return {canonicalize(initial)}
@@ -151,12 +200,18 @@ def enumerate_polyiamonds(n: int) -> Set[Polyiamond]:
 
     for size in range(2, n + 1):
         next_shapes: Set[Polyiamond] = set()
+        # Every orientation of every shape found so far at this size. A child
+        # already in here belongs to a known class and needs no canonicalizing.
+        seen: Set[Polyiamond] = set()
 
         for shape in current_shapes:
             for new_tri in get_boundary(shape):
-                new_shape = shape | {new_tri}
-                canonical = canonicalize(new_shape)
-                next_shapes.add(canonical)
+                new_shape = normalize_position(shape + (new_tri,))
+                if new_shape in seen:
+                    continue
+                forms = symmetric_forms(new_shape)
+                seen.update(forms)
+                next_shapes.add(min(forms))
 
         current_shapes = next_shapes
 
@@ -164,19 +219,8 @@ def enumerate_polyiamonds(n: int) -> Set[Polyiamond]:
 
 
 def triangle_to_qr(tri: Triangle) -> Tuple[int, int, int]:
-    """Convert vertex-based triangle to (q, r, orientation) format."""
-    verts = sorted(tri)
-    up = is_up_pointing(tri)
-
-    if up:
-        # Up triangle: bottom-left vertex is at (q, r)
-        q, r = min(verts, key=lambda v: (v[1], v[0]))
-    else:
-        # Down triangle: top-left vertex is at (q, r+1), so q, r is one less in r
-        top_left = min((v for v in verts if v[1] == max(v2[1] for v2 in verts)), key=lambda v: v[0])
-        q, r = top_left[0], top_left[1] - 1
-
-    return (q, r, 0 if up else 1)
+    """Convert triangle key to (q, r, orientation) format."""
+    return unpack_triangle(tri)
 
 
 def shape_to_ascii(shape: Polyiamond) -> str:
@@ -213,19 +257,19 @@ def shape_to_ascii(shape: Polyiamond) -> str:
     return '\n'.join(''.join(row).rstrip() for row in grid)
 
 
-def polyiamond_to_graph(shape: Polyiamond) -> Tuple[Set[Vertex], Set[FrozenSet[Vertex]]]:
+def polyiamond_to_graph(shape: Polyiamond) -> Tuple[Set[Vertex], Set[Tuple[Vertex, Vertex]]]:
     """Convert polyiamond to graph (vertices and edges)."""
     vertices = set()
     edges = set()
 
     for tri in shape:
-        verts = list(tri)
+        verts = triangle_vertices(tri)
         for v in verts:
             vertices.add(v)
-        # Add the 3 edges of this triangle
-        for i in range(3):
-            edge = frozenset([verts[i], verts[(i+1) % 3]])
-            edges.add(edge)
+        # Add the 3 edges of this triangle; verts are sorted, so each edge is too
+        edges.add((verts[0], verts[1]))
+        edges.add((verts[0], verts[2]))
+        edges.add((verts[1], verts[2]))
 
     return vertices, edges
 
@@ -278,7 +322,7 @@ def main():
                 print(f"\n--- Polyiamond {i} ---")
                 print(shape_to_ascii(shape))
     elif show:
-        shapes_list = sorted(shapes, key=lambda s: sorted(tuple(sorted(tri)) for tri in s))
+        shapes_list = sorted(shapes)
         for i, shape in enumerate(shapes_list, 1):
             print(f"\n--- Polyiamond {i} ---")
             print(shape_to_ascii(shape))
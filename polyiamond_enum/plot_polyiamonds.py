@@ -5,157 +5,424 @@ Reads vertex coordinates from a simple text format output by the Go enumerator.
 """
 
 import sys
+import json
+import atexit
 import math
+import hashlib
+import pathlib
+import shutil
+import itertools
 import subprocess
-import tempfile
-import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.markers import MarkerStyle
+from PIL import Image, ImageDraw, ImageFont
+
+# Bit weights of one graph6 6-bit group, most significant first
+_G6_WEIGHTS = np.array([32, 16, 8, 4, 2, 1], dtype=np.uint8)
+
+# 6-bit value -> printable graph6/sparse6 byte
+_G6CHARS = np.frombuffer(bytes(range(63, 127)), dtype=np.uint8)
+
+_SQRT3_2 = math.sqrt(3) / 2
+
+# Vertex marker shared by every subplot's scatter
+_VERTEX_MARKER = MarkerStyle('o')
 
 
 def to_cartesian(a, b):
     """Convert triangular lattice (a,b) to cartesian (x,y)."""
-    x = a + b * 0.5
-    y = b * math.sqrt(3) / 2
-    return x, y
+    return a + b * 0.5, b * _SQRT3_2
+
+
+def to_cartesian_batch(ab):
+    """Convert an (n, 2) array of lattice (a,b) to an (n, 2) array of (x,y)."""
+    ab = np.asarray(ab, dtype=np.float64).reshape(-1, 2)
+    return np.stack([ab[:, 0] + 0.5 * ab[:, 1], ab[:, 1] * _SQRT3_2], axis=1)
 
 
 def graph_to_g6(n, edges):
     """Convert graph to graph6 format."""
-    # Build adjacency matrix
-    adj = [[False] * n for _ in range(n)]
-    for e1, e2 in edges:
-        if e1 > e2:
-            e1, e2 = e2, e1
-        adj[e1][e2] = True
+    # Build adjacency matrix (upper triangle only)
+    adj = np.zeros((n, n), dtype=bool)
+    E = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    adj[np.minimum(E[:, 0], E[:, 1]), np.maximum(E[:, 0], E[:, 1])] = True
 
     # Encode n
     result = [chr(n + 63)] if n <= 62 else [chr(126), chr((n >> 12) + 63), chr(((n >> 6) & 63) + 63), chr((n & 63) + 63)]
 
-    # Encode upper triangle
-    bits = []
-    for j in range(1, n):
-        for i in range(j):
-            bits.append(adj[i][j])
+    # Encode upper triangle column by column: j outer, i < j inner
+    j, i = np.tril_indices(n, -1)
+    bits = adj[i, j].astype(np.uint8)
 
     # Pad to multiple of 6
-    while len(bits) % 6 != 0:
-        bits.append(False)
+    bits = np.pad(bits, (0, -len(bits) % 6))
+
+    # Convert each 6-bit group to a character
+    vals = bits.reshape(-1, 6) @ _G6_WEIGHTS
+    result.append(_G6CHARS[vals].tobytes().decode('ascii'))
+
+    return ''.join(result)
+
 
-    # Convert to characters
-    for i in range(0, len(bits), 6):
-        val = sum((1 << (5 - j)) for j in range(6) if bits[i + j])
-        result.append(chr(val + 63))
+def graph_to_s6(n, edges):
+    """Convert graph to sparse6 format."""
+    # Encode n, same as graph6, after the ':' marker
+    result = [':', chr(n + 63)] if n <= 62 else [':', chr(126), chr((n >> 12) + 63),
+                                                chr(((n >> 6) & 63) + 63), chr((n & 63) + 63)]
+
+    # k bits per vertex index; edges as (u <= v), ordered by v then u
+    k = (n - 1).bit_length()
+    E = np.sort(np.asarray(edges, dtype=np.int64).reshape(-1, 2), axis=1)
+    E = E[np.lexsort((E[:, 0], E[:, 1]))]
+
+    # Each step is a (b, x) pair: b=1 advances the current vertex, x is a vertex index
+    steps = []
+    cur = 0
+    for u, v in E.tolist():
+        if v == cur:
+            steps.append((0, u))
+        elif v == cur + 1:
+            steps.append((1, u))
+            cur = v
+        else:
+            steps.append((1, v))
+            steps.append((0, u))
+            cur = v
+
+    bits = np.zeros((len(steps), k + 1), dtype=np.uint8)
+    if steps:
+        b, x = np.array(steps, dtype=np.int64).T
+        bits[:, 0] = b
+        bits[:, 1:] = (x[:, None] >> np.arange(k - 1, -1, -1)) & 1
+    bits = bits.ravel()
+
+    # Pad with 1s to a multiple of 6; a leading 0 keeps the padding from
+    # decoding as an extra edge when n is a power of two and cur == n - 2
+    pad = -len(bits) % 6
+    if k < 6 and n == 1 << k and pad >= k + 1 and cur == n - 2:
+        bits = np.concatenate([bits, [0]])
+        pad -= 1
+    bits = np.concatenate([bits, np.ones(pad, dtype=np.uint8)])
+
+    vals = bits.reshape(-1, 6) @ _G6_WEIGHTS
+    result.append(_G6CHARS[vals].tobytes().decode('ascii'))
 
     return ''.join(result)
 
 
+def graph_to_shortg(n, edges):
+    """Encode a graph as sparse6 or graph6, whichever is shorter for its density.
+
+    graph6 costs n(n-1)/2 bits; sparse6 roughly k+2 bits per edge.
+    """
+    m = len(edges)
+    if m * ((n - 1).bit_length() + 2) < n * (n - 1) // 2:
+        return graph_to_s6(n, edges)
+    return graph_to_g6(n, edges)
+
+
+# shortg results cache; bump the version when the stored format or meaning changes
+CACHE_DIR = pathlib.Path.home() / '.cache' / 'polyiamond'
+CACHE_VERSION = 1
+
+
 def canonicalize_g6(g6_strings):
-    """Use nauty's shortg to get canonical g6 forms."""
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.g6', delete=False) as f:
-        for s in g6_strings:
-            f.write(s + '\n')
-        tmp_in = f.name
+    """Use nauty's shortg to get the canonical g6 form of each input graph.
+
+    Inputs may be graph6 or sparse6; the output is always graph6.
+
+    Results are cached on disk keyed by the SHA-256 of the sorted input, so
+    rerunning on the same graphs skips shortg.
+    """
+    key = hashlib.sha256('\n'.join(sorted(g6_strings)).encode()).hexdigest()
+    path = CACHE_DIR / f'{key}.json'
+    try:
+        cached = json.loads(path.read_text())
+        if cached.get('version') == CACHE_VERSION:
+            return [cached['canonical'][s] for s in g6_strings]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    canonical = _run_shortg(g6_strings)
+
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({'version': CACHE_VERSION,
+                                    'canonical': dict(zip(g6_strings, canonical))}))
+    except OSError:
+        pass
+    return canonical
+
 
-    result = subprocess.run(['shortg', '-q', tmp_in], capture_output=True, text=True)
+def _run_shortg(g6_strings):
+    """Canonical g6 form of each input graph from one shortg call.
 
-    # Read the canonicalized file
-    with open(tmp_in, 'r') as f:
-        canonical = [line.strip() for line in f if line.strip()]
+    shortg sorts and deduplicates its output, so -v is used to map every
+    input back to its output class; the result is aligned with g6_strings.
+    """
+    result = subprocess.run(['shortg', '-q', '-v', '-g'], input=''.join(s + '\n' for s in g6_strings),
+                            capture_output=True, text=True, check=True)
+    outputs = result.stdout.split()
 
-    import os
-    os.unlink(tmp_in)
+    # -v lines look like "  23 : 30 154 78", wrapping long input lists
+    canonical = [None] * len(g6_strings)
+    out_idx = None
+    for line in result.stderr.splitlines():
+        if ':' in line:
+            head, line = line.split(':', 1)
+            out_idx = int(head) - 1
+        for tok in line.split():
+            canonical[int(tok) - 1] = outputs[out_idx]
 
     return canonical
 
 
+class NautyPipe:
+    """Long-lived dreadnaut process that canonically labels one graph at a time.
+
+    Saves the shortg fork/exec on every call when many small batches are
+    canonicalized in one session.
+    """
+
+    def __init__(self):
+        # dreadnaut block-buffers stdout on a pipe; stdbuf makes it answer per line
+        self.proc = subprocess.Popen(['stdbuf', '-oL', 'dreadnaut'], stdin=subprocess.PIPE,
+                                     stdout=subprocess.PIPE, text=True, bufsize=1)
+        # c: compute canonical labelling; -a -m: no automorphism/level output
+        self.proc.stdin.write('c -a -m\n')
+
+    def canonicalize(self, edges, n):
+        """Return the canonical adjacency lists of the graph as a fingerprint.
+
+        Two graphs get equal fingerprints iff they are isomorphic.
+        """
+        E = np.sort(np.asarray(edges, dtype=np.int64).reshape(-1, 2), axis=1)
+        # "a:b;" with a < b leaves the cursor at a + 1 <= n - 1, always valid
+        adj = ''.join(f'{a}:{b};' for a, b in E.tolist())
+        self.proc.stdin.write(f'n={n} g {adj}. x "BEGIN\\n" b "END\\n"\n')
+        self.proc.stdin.flush()
+
+        line = self.proc.stdout.readline()
+        while line and line.strip() != 'BEGIN':
+            line = self.proc.stdout.readline()
+        # b prints the labelling, then "v : nbrs;" lines; keep only the latter
+        out = []
+        line = self.proc.stdout.readline()
+        while line and line.strip() != 'END':
+            if out or ':' in line:
+                out.append(line.strip())
+            line = self.proc.stdout.readline()
+        if not line:
+            raise RuntimeError('dreadnaut exited unexpectedly')
+        return ' '.join(out).encode()
+
+    def close(self):
+        """Quit dreadnaut and close both pipes."""
+        if self.proc.poll() is None:
+            self.proc.stdin.write('q\n')
+        self.proc.stdin.close()
+        self.proc.wait()
+        self.proc.stdout.close()
+
+
+_NAUTY = None
+
+
+def nauty_pipe():
+    """Shared NautyPipe, started on first use; None if dreadnaut or stdbuf is missing."""
+    global _NAUTY
+    if _NAUTY is None:
+        _NAUTY = NautyPipe() if shutil.which('dreadnaut') and shutil.which('stdbuf') else False
+        if _NAUTY:
+            atexit.register(_NAUTY.close)
+    return _NAUTY or None
+
+
+def _parse_pairs(lines, count):
+    """Parse count lines of two ints each into a (count, 2) int array."""
+    if count == 0:
+        return np.empty((0, 2), dtype=np.int32)
+    return np.fromstring(' '.join(lines), dtype=np.int32, sep=' ').reshape(count, 2)
+
+
+def iter_graph_file(filename):
+    """Yield the graphs of a graph file one at a time, reading it line by line.
+
+    Each graph's 'vertices' and 'edges' are (k, 2) int arrays.
+    """
+    with open(filename, 'r') as f:
+        lines = (line.strip() for line in f)
+        lines = (line for line in lines if line)
+
+        # Each block: GRAPH id / VERTICES nv / nv pairs / EDGES ne / ne pairs
+        for line in lines:
+            if not line.startswith('GRAPH'):
+                continue
+            graph_id = int(line.split()[1])
+            nv = int(next(lines).split()[1])
+            vertices = _parse_pairs(list(itertools.islice(lines, nv)), nv)
+            ne = int(next(lines).split()[1])
+            edges = _parse_pairs(list(itertools.islice(lines, ne)), ne)
+            yield {'id': graph_id, 'vertices': vertices, 'edges': edges}
+
+
+def is_marked_unique(filename):
+    """True if the graph file starts with UNIQUE, i.e. its graphs are already
+    pairwise non-isomorphic."""
+    with open(filename, 'r') as f:
+        for line in f:
+            if line.strip():
+                return line.strip() == 'UNIQUE'
+    return False
+
+
 def parse_graph_file(filename):
-    """Parse graph file with vertices and edges."""
-    graphs = []
+    """Parse graph file with vertices and edges into a list of graphs."""
+    return list(iter_graph_file(filename))
 
-    with open(filename, 'r') as f:
-        lines = [line.strip() for line in f if line.strip()]
-
-    i = 0
-    while i < len(lines):
-        if lines[i].startswith('GRAPH'):
-            graph = {'id': int(lines[i].split()[1]), 'vertices': [], 'edges': []}
-            i += 1
-
-            nv = int(lines[i].split()[1])
-            i += 1
-            for _ in range(nv):
-                a, b = map(int, lines[i].split())
-                graph['vertices'].append((a, b))
-                i += 1
-
-            ne = int(lines[i].split()[1])
-            i += 1
-            for _ in range(ne):
-                e1, e2 = map(int, lines[i].split())
-                graph['edges'].append((e1, e2))
-                i += 1
-
-            graphs.append(graph)
-        else:
-            i += 1
 
-    return graphs
+def edge_key(n, edges):
+    """Hashable key for an exact (n, edge set) match, independent of edge order."""
+    E = np.sort(np.asarray(edges, dtype=np.int64).reshape(-1, 2), axis=1)
+    return n, np.unique(E, axis=0).tobytes()
 
 
 def filter_isomorphic(graphs):
-    """Keep only one representative per isomorphism class."""
-    # Convert each graph to g6
-    g6_list = []
+    """Keep only one representative per isomorphism class.
+
+    graphs may be any iterable, e.g. iter_graph_file(). With dreadnaut it is
+    consumed one graph at a time and only the survivors are kept in memory;
+    the shortg fallback needs the whole batch.
+    """
+    if isinstance(graphs, list) and len(graphs) < 2:
+        return graphs
+
+    nauty = nauty_pipe()
+    if nauty is None:
+        return _filter_isomorphic_shortg(list(graphs))
+
+    seen = set()
+    unique_graphs = []
     for g in graphs:
-        n = len(g['vertices'])
-        g6 = graph_to_g6(n, g['edges'])
-        g6_list.append(g6)
+        canon = nauty.canonicalize(g['edges'], len(g['vertices']))
+        if canon not in seen:
+            seen.add(canon)
+            unique_graphs.append(g)
 
-    # Get canonical forms
+    return unique_graphs
+
+
+def _filter_isomorphic_shortg(graphs):
+    """filter_isomorphic for a list of graphs, with one shortg batch."""
+    if len(graphs) < 2:
+        return graphs
+
+    # Graphs with identical edge sets are trivially isomorphic; only the first
+    # of each goes through shortg
+    first = {}
+    for idx, g in enumerate(graphs):
+        first.setdefault(edge_key(len(g['vertices']), g['edges']), idx)
+    reps = list(first.values())
+
+    g6_list = [graph_to_shortg(len(graphs[i]['vertices']), graphs[i]['edges']) for i in reps]
     canonical = canonicalize_g6(g6_list)
 
-    # Keep first occurrence of each canonical form
+    # Keep first occurrence of each canonical form; reps are in input order
     seen = set()
     unique_graphs = []
-    for g, canon in zip(graphs, canonical):
+    for idx, canon in zip(reps, canonical):
         if canon not in seen:
             seen.add(canon)
-            unique_graphs.append(g)
+            unique_graphs.append(graphs[idx])
 
     return unique_graphs
 
 
+# PIL grid layout, in pixels (matches the matplotlib version at dpi=150)
+CELL_SIZE = 900
+CELL_MARGIN = 60
+TITLE_HEIGHT = 50
+VERTEX_RADIUS = 16
+
+
 def plot_graphs(graphs, output_file):
-    """Plot graphs in a grid layout."""
+    """Plot graphs in a grid layout on a single PIL canvas."""
     n = len(graphs)
     cols = min(n, 2)
     rows = (n + cols - 1) // cols
 
-    fig, axes = plt.subplots(rows, cols, figsize=(6*cols, 6*rows))
-    if n == 1:
-        axes = [axes]
-    else:
-        axes = axes.flatten()
+    img = Image.new('RGB', (cols * CELL_SIZE, rows * CELL_SIZE), 'white')
+    draw = ImageDraw.Draw(img)
+    title_font = ImageFont.load_default(size=24)
+    label_font = ImageFont.load_default(size=16)
 
     for idx, graph in enumerate(graphs):
-        ax = axes[idx]
+        x0 = (idx % cols) * CELL_SIZE
+        y0 = (idx // cols) * CELL_SIZE
 
         # Convert vertices to cartesian
-        pos = [to_cartesian(a, b) for a, b in graph['vertices']]
+        pos = to_cartesian_batch(graph['vertices'])
+
+        # One affine map per graph: fit the bounding box, equal aspect, y up
+        lo = pos.min(axis=0)
+        hi = pos.max(axis=0)
+        span = max((hi - lo).max(), 1e-9)
+        scale = (CELL_SIZE - 2 * CELL_MARGIN - TITLE_HEIGHT) / span
+        cx = x0 + CELL_SIZE / 2 - scale * (hi[0] + lo[0]) / 2
+        cy = y0 + (CELL_SIZE + TITLE_HEIGHT) / 2 + scale * (hi[1] + lo[1]) / 2
+        pix = [tuple(p) for p in (np.array([cx, cy]) + scale * pos * [1, -1]).tolist()]
 
         # Draw edges
         for e1, e2 in graph['edges']:
-            x1, y1 = pos[e1]
-            x2, y2 = pos[e2]
-            ax.plot([x1, x2], [y1, y2], 'gray', linewidth=1.5, zorder=1)
+            draw.line((pix[e1], pix[e2]), fill='gray', width=2)
+
+        # Draw and label vertices
+        for i, (x, y) in enumerate(pix):
+            draw.ellipse((x - VERTEX_RADIUS, y - VERTEX_RADIUS, x + VERTEX_RADIUS, y + VERTEX_RADIUS),
+                         fill='lightblue', outline='black', width=2)
+            draw.text((x, y), str(i), fill='black', font=label_font, anchor='mm')
+
+        nv = len(graph['vertices'])
+        ne = len(graph['edges'])
+        draw.text((x0 + CELL_SIZE / 2, y0 + TITLE_HEIGHT), f"Graph {graph['id']}: {nv}v, {ne}e",
+                  fill='black', font=title_font, anchor='mm')
+
+    img.save(output_file)
+    print(f"Saved to {output_file}")
+
+
+def plot_graphs_mpl(graphs, output_file):
+    """Plot graphs in a grid layout with matplotlib."""
+    n = len(graphs)
+    cols = min(n, 2)
+    rows = (n + cols - 1) // cols
+
+    # Object-oriented API on an explicit Agg canvas: no pyplot state or backend lookup
+    fig = Figure(figsize=(6*cols, 6*rows), dpi=150)
+    canvas = FigureCanvasAgg(fig)
+    axes = fig.subplots(rows, cols, squeeze=False).flatten()
+
+    for idx, graph in enumerate(graphs):
+        ax = axes[idx]
+
+        # Convert vertices to cartesian
+        pos = to_cartesian_batch(graph['vertices'])
+
+        # Draw edges as one collection
+        edges = np.asarray(graph['edges'], dtype=np.int64).reshape(-1, 2)
+        ax.add_collection(LineCollection(pos[edges], colors='gray', linewidths=1.5, zorder=1,
+                                         rasterized=True))
 
         # Draw vertices
-        xs = [p[0] for p in pos]
-        ys = [p[1] for p in pos]
-        ax.scatter(xs, ys, s=200, c='lightblue', edgecolors='black', zorder=2)
+        ax.scatter(pos[:, 0], pos[:, 1], s=200, c='lightblue', edgecolors='black', zorder=2,
+                   marker=_VERTEX_MARKER)
 
         # Label vertices
-        for i, (x, y) in enumerate(pos):
-            ax.annotate(str(i), (x, y), ha='center', va='center', fontsize=8)
+        for i, (x, y) in enumerate(pos.tolist()):
+            ax.text(x, y, str(i), ha='center', va='center', fontsize=8, zorder=3)
 
         ax.set_aspect('equal')
         nv = len(graph['vertices'])
@@ -167,29 +434,45 @@ def plot_graphs(graphs, output_file):
     for idx in range(n, len(axes)):
         axes[idx].axis('off')
 
-    plt.tight_layout()
-    plt.savefig(output_file, dpi=150)
+    fig.tight_layout()
+    canvas.print_png(output_file)
     print(f"Saved to {output_file}")
 
 
 def main():
     if len(sys.argv) < 3:
-        print(f"Usage: {sys.argv[0]} <input.txt> <output.png> [--unique]")
+        print(f"Usage: {sys.argv[0]} <input.txt> <output.png> [--unique] [--mpl]")
         print("  --unique: filter to keep only non-isomorphic graphs")
+        print("  --mpl: render with matplotlib instead of PIL")
         sys.exit(1)
 
     input_file = sys.argv[1]
     output_file = sys.argv[2]
     unique = '--unique' in sys.argv
 
-    graphs = parse_graph_file(input_file)
-    print(f"Loaded {len(graphs)} graphs")
+    if unique and not is_marked_unique(input_file):
+        # Stream the file through the filter so only unique graphs are held
+        loaded = 0
+
+        def counted(stream):
+            nonlocal loaded
+            for g in stream:
+                loaded += 1
+                yield g
 
-    if unique:
-        graphs = filter_isomorphic(graphs)
+        graphs = filter_isomorphic(counted(iter_graph_file(input_file)))
+        print(f"Loaded {loaded} graphs")
         print(f"After isomorphism filtering: {len(graphs)} unique graphs")
+    else:
+        graphs = parse_graph_file(input_file)
+        print(f"Loaded {len(graphs)} graphs")
+        if unique:
+            print("Input is marked UNIQUE, skipping isomorphism filtering")
 
-    plot_graphs(graphs, output_file)
+    if '--mpl' in sys.argv:
+        plot_graphs_mpl(graphs, output_file)
+    else:
+        plot_graphs(graphs, output_file)
 
 
 if __name__ == "__main__":